@@ -9,8 +9,9 @@ class LogisticRegression(BaseEstimator, LinearClassifierMixin,
     This class implements regularized logistic regression using the
     `liblinear` library, newton-cg and lbfgs solvers. It can handle both
     dense and sparse input. Use C-ordered arrays or CSR matrices containing
-    64-bit floats for optimal performance; any other input format will be
-    converted (and copied).
+    64-bit floats (or 32-bit floats with dtype=np.float32 and the lbfgs or
+    newton-cg solver) for optimal performance; any other input format will
+    be converted (and copied).
     The newton-cg and lbfgs solvers support only L2 regularization with primal
     formulation. The liblinear solver supports both L1 and L2 regularization,
     with a dual formulation only for the L2 penalty.
@@ -65,6 +66,8 @@ class LogisticRegression(BaseEstimator, LinearClassifierMixin,
     verbose : int
         For the liblinear and lbfgs solvers set verbose to any positive
         number for verbosity.
+    dtype : np.float64 | np.float32
+        Precision X is checked into; liblinear always uses np.float64.
     Attributes
     ----------
     coef_ : array, shape (n_classes, n_features)
@@ -105,7 +108,7 @@ class LogisticRegression(BaseEstimator, LinearClassifierMixin,
     def __init__(self, penalty='l2', dual=False, tol=1e-4, C=1.0,
                  fit_intercept=True, intercept_scaling=1, class_weight=None,
                  random_state=None, solver='liblinear', max_iter=100,
-                 multi_class='ovr', verbose=0):
+                 multi_class='ovr', verbose=0, dtype=np.float64):
 
 		#initializations
         self.penalty = penalty
@@ -120,6 +123,7 @@ class LogisticRegression(BaseEstimator, LinearClassifierMixin,
         self.max_iter = max_iter
         self.multi_class = multi_class
         self.verbose = verbose
+        self.dtype = dtype
 
     def fit(self, X, y):
         """Fit the model according to the given training data.
@@ -140,8 +144,10 @@ class LogisticRegression(BaseEstimator, LinearClassifierMixin,
             raise ValueError("Penalty term must be positive; got (C=%r)"
                              % self.C)
 
+		#liblinear is compiled for float64 only
+        dtype = np.float64 if self.solver == 'liblinear' else self.dtype
 		#Check X and y to have consistent length
-        X, y = check_X_y(X, y, accept_sparse='csr', dtype=np.float64, order="C")
+        X, y = check_X_y(X, y, accept_sparse='csr', dtype=dtype, order="C")
         #set the number of classes to be the number of unique y values
 		self.classes_ = np.unique(y)
 		#limits solvers to these types
@@ -203,7 +209,7 @@ class LogisticRegression(BaseEstimator, LinearClassifierMixin,
                 fit_intercept=self.fit_intercept, tol=self.tol,
                 verbose=self.verbose, solver=self.solver,
                 multi_class=self.multi_class, max_iter=self.max_iter,
-                class_weight=self.class_weight)
+                class_weight=self.class_weight, dtype=dtype)
             self.coef_.append(coef_[0])
 		#squeeze some coefs
         self.coef_ = np.squeeze(self.coef_)
@@ -226,7 +232,8 @@ class LogisticRegression(BaseEstimator, LinearClassifierMixin,
 								 max_iter=100, tol=1e-4, verbose=0,
 								 solver='lbfgs', coef=None, copy=True,
 								 class_weight=None, dual=False, penalty='l2',
-								 intercept_scaling=1., multi_class='ovr'):
+								 intercept_scaling=1., multi_class='ovr',
+								 dtype=np.float64):
 		"""Compute a Logistic Regression model for a list of regularization
 		parameters.
 		This is an implementation that uses the result of the previous model
@@ -296,6 +303,8 @@ class LogisticRegression(BaseEstimator, LinearClassifierMixin,
 			the loss minimised is the multinomial loss fit across
 			the entire probability distribution. Works only for the 'lbfgs'
 			solver.
+		dtype : np.float64 | np.float32
+			Precision X is checked into; liblinear always uses np.float64.
 		Returns
 		-------
 		coefs : ndarray, shape (n_cs, n_features) or (n_cs, n_features + 1)
@@ -334,7 +343,10 @@ class LogisticRegression(BaseEstimator, LinearClassifierMixin,
 								 "dual=False, got dual=%s" % dual)
 		# Preprocessing.
 		#^Check X,y
-		X = check_array(X, accept_sparse='csr', dtype=np.float64)
+		#liblinear is compiled for float64 only
+		if solver == 'liblinear':
+			dtype = np.float64
+		X = check_array(X, accept_sparse='csr', dtype=dtype)
 		y = check_array(y, ensure_2d=False, copy=copy, dtype=None)
 		#odd notation trick
 		_, n_features = X.shape
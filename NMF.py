@@ -75,6 +75,8 @@ def _initialize_nmf(X, n_components, variant=None, eps=1e-6,
     random_state : numpy.RandomState | int, optional
         The generator used to fill in the zeros, when using variant='ar'
         Default: numpy.random
+    W and H have the dtype of X when X is float32 or float64 so a float32
+    input is never upcast; any other dtype gives float64.
     Returns
     -------
     (W, H) :
@@ -94,8 +96,10 @@ def _initialize_nmf(X, n_components, variant=None, eps=1e-6,
 	
 	#take a random SVD using our data and n components (2 in this case) becomes U, S, H
     U, S, V = randomized_svd(X, n_components)
+	#keep float32 input in float32, everything else is computed in float64
+    dtype = X.dtype if X.dtype in (np.float32, np.float64) else np.float64
 	#W(rows of X by 2), H(2 by columns of X) are the products of NMF, we use the same shapes as U and V
-    W, H = np.zeros(U.shape), np.zeros(V.shape)
+    W, H = np.zeros(U.shape, dtype=dtype), np.zeros(V.shape, dtype=dtype)
 
     # The leading singular triplet is non-negative
     # so it can be used as is for initialization.
@@ -159,8 +163,11 @@ def _initialize_nmf(X, n_components, variant=None, eps=1e-6,
 		avg = X.mean()
 		#all zeros in W and H are now the absolute value of (avg * a random  number between 0 and the 
 		#number of entries in W and H equal to zero) / 100
-        W[W == 0] = abs(avg * random_state.randn(len(W[W == 0])) / 100)
-        H[H == 0] = abs(avg * random_state.randn(len(H[H == 0])) / 100)
+		#the mask is built once per matrix instead of twice
+        for A in (W, H):
+            mask = A == 0
+            A[mask] = np.abs(avg * random_state.randn(np.count_nonzero(mask))
+                             / 100)
 
 	#results in a W and an H. This works because it runs at least 200 times and picks the best W and H
 	#as defined by reconstruction error (lower values means the froenbius norm is closer to zero) meaning
@@ -0,0 +1,163 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from code.corpus import Corpus
+from code.phrase_match import PhraseMatcher
+
+#Sentence boundaries; TripAdvisor reviews often run sentences together
+#without a space ("roomy.The location") so none is required after the stop
+SENTENCE = re.compile(r'[.!?\n]+')
+
+class AspectSentiment:
+    #seedpath is edmunds.seed or tripadvisor.seed, lexicon a {word: 1 | -1}
+    #dict such as Corpus.ReadBingLiu or Corpus.ReadMPQA
+    def __init__(self, seedpath, lexicon):
+        self.corpus = Corpus()
+        seeds = self.corpus.ReadSeeds(seedpath)
+        self.aspects = sorted(seeds)
+        #seed phrases pick the aspect, the lexicon scores the tokens left
+        #over; most seeds contain a lexicon word ("comfortable", "clean")
+        #which would otherwise score every sentence it selects
+        self.aspect_matcher = PhraseMatcher.FromSeeds(seeds)
+        self.lexicon_matcher = PhraseMatcher.FromLexicon(lexicon)
+        self.aspect_index = dict((aspect, j) for j, aspect in
+                                 enumerate(self.aspects))
+        self.polarity = np.array([self.lexicon_matcher.group_names[group]
+                                  for group in self.lexicon_matcher.groups])
+
+    #Split a review into sentences
+    def Sentences(self, review):
+        return [sentence for sentence in SENTENCE.split(review)
+                if sentence.strip()]
+
+    #Score a chunk of sentences. Returns the sparse (sentence x aspect)
+    #assignment and the lexicon score of every sentence,
+    #(pos - neg) / (pos + neg) so it lies in [-1, 1] and is 0 with no hits.
+    #Tokens inside a matched seed phrase are masked before lexicon scoring
+    def ScoreSentences(self, sentences):
+        aspect_matcher, lexicon_matcher = self.aspect_matcher, \
+            self.lexicon_matcher
+        rows, columns = [], []
+        score = np.zeros(len(sentences))
+        for i, sentence in enumerate(sentences):
+            tokens = self.corpus.Tokenize(sentence)
+            matches = aspect_matcher.MatchTokens(tokens)
+            if not matches:
+                continue
+            aspects = set()
+            for end, phrase_id in matches:
+                aspects.add(aspect_matcher.group_names[
+                    aspect_matcher.groups[phrase_id]])
+                start = end - aspect_matcher.lengths[phrase_id] + 1
+                tokens[start:end + 1] = [None] * (end + 1 - start)
+            for aspect in aspects:
+                rows.append(i)
+                columns.append(self.aspect_index[aspect])
+            hits = [self.polarity[phrase_id] for end, phrase_id in
+                    lexicon_matcher.MatchTokens(tokens)]
+            if hits:
+                score[i] = float(sum(hits)) / len(hits)
+        assigned = sp.csr_matrix((np.ones(len(rows)), (rows, columns)),
+                                 shape=(len(sentences), len(self.aspects)))
+        return assigned, score
+
+    #Stream one corpus (Corpus.IterEdmunds or Corpus.IterTripAdvisor) in a
+    #single pass. Sentences are buffered chunksize at a time and reduced per
+    #entity with a sparse (entity x sentence) group-by, so only the
+    #entity x aspect sums and counts are kept in memory
+    def Aggregate(self, datapath, source, shards=None, chunksize=20000):
+        reviews = {'cars': self.corpus.IterEdmunds,
+                   'hotels': self.corpus.IterTripAdvisor}[source]
+        #the entity list is known up front from the file names
+        entities = [(shard, entity) for shard, entity, path in
+                    self.corpus.IterFiles(datapath, shards)]
+        entity_index = dict((entity, i) for i, (shard, entity) in
+                            enumerate(entities))
+        sums = np.zeros((len(entities), len(self.aspects)))
+        counts = np.zeros((len(entities), len(self.aspects)))
+        n_reviews = np.zeros(len(entities), dtype=np.int64)
+
+        def flush(sentences, owners):
+            assigned, score = self.ScoreSentences(sentences)
+            group = sp.csr_matrix((np.ones(len(owners)), (owners,
+                                   np.arange(len(owners)))),
+                                  shape=(len(entities), len(owners)))
+            sums[:] += group.dot(assigned.multiply(score[:, None])).toarray()
+            counts[:] += group.dot(assigned).toarray()
+
+        sentences, owners = [], []
+        for shard, entity, review in reviews(datapath, shards):
+            i = entity_index[entity]
+            n_reviews[i] += 1
+            split = self.Sentences(review)
+            sentences.extend(split)
+            owners.extend([i] * len(split))
+            if len(sentences) >= chunksize:
+                flush(sentences, owners)
+                sentences, owners = [], []
+        if sentences:
+            flush(sentences, owners)
+
+        #mean sentence score per aspect, NaN when no sentence hit the aspect
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scores = sums / counts
+        df = pd.DataFrame(scores, columns=self.aspects)
+        for j, aspect in enumerate(self.aspects):
+            df['n_' + aspect] = counts[:, j].astype(np.int64)
+        df.insert(0, 'num_reviews', n_reviews)
+        df.insert(0, 'shard', [shard for shard, entity in entities])
+        df.insert(0, 'doc_id', [entity for shard, entity in entities])
+        return df
+
+    #Read the ground truth rating CSVs (<shard>.csv next to the shard folders)
+    #into one frame keyed by doc_id. Ratings <= 0 mean "not rated"
+    def Ratings(self, datapath, shards=None):
+        rows = []
+        for shard, row in self.corpus.IterRatings(datapath, shards):
+            #Edmunds calls the key docid, TripAdvisor doc_id
+            rows.append(dict([('doc_id', row.get('doc_id', row.get('docid')))]
+                             + [(aspect, float(row[aspect] or 'nan'))
+                                for aspect in self.aspects if aspect in row]))
+        aspects = [aspect for aspect in self.aspects
+                   if any(aspect in row for row in rows)]
+        ratings = pd.DataFrame(rows, columns=['doc_id'] + aspects)
+        ratings = ratings.drop_duplicates('doc_id').set_index('doc_id')
+        return ratings.where(ratings > 0)
+
+    #Pearson and Spearman correlation of every aspect score with the rating
+    #of the same name, over entities that have both
+    def Correlate(self, scores, ratings):
+        joined = scores.set_index('doc_id').join(ratings, rsuffix='_rating',
+                                                 how='inner')
+        rows = []
+        for aspect in self.aspects:
+            if aspect + '_rating' not in joined.columns:
+                continue
+            pair = joined[[aspect, aspect + '_rating']].dropna()
+            rows.append({'aspect': aspect, 'entities': len(pair),
+                         'pearson': pair.corr(method='pearson').iloc[0, 1],
+                         'spearman': pair.corr(method='spearman').iloc[0, 1]})
+        return pd.DataFrame(rows, columns=['aspect', 'entities', 'pearson',
+                                           'spearman'])
+
+    #Batch job: aggregate one corpus, write the entity x aspect score table
+    #and return its correlation with the rating CSVs
+    def Run(self, datapath, source, outpath, shards=None):
+        scores = self.Aggregate(datapath, source, shards)
+        folder = os.path.dirname(outpath)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        scores.to_csv(outpath, index=False)
+        return self.Correlate(scores, self.Ratings(datapath, shards))
+
+if __name__ == '__main__':
+    lexicon = Corpus().ReadBingLiu(r'data/sentiment')
+    hotels = AspectSentiment(r'data/hotels/tripadvisor.seed', lexicon)
+    print(hotels.Run(r'data/hotels/data', 'hotels',
+                     r'aspects/hotel_aspects.csv'))
+    cars = AspectSentiment(r'data/cars/edmunds.seed', lexicon)
+    print(cars.Run(r'data/cars/data', 'cars', r'aspects/car_aspects.csv'))
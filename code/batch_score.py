@@ -0,0 +1,228 @@
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import warnings
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from code.corpus import Corpus
+
+#Model artifact loaded once per worker process
+_MODEL = None
+
+def _init_worker(modelpath):
+    global _MODEL
+    with open(modelpath, 'rb') as fo:
+        _MODEL = pickle.load(fo)
+
+def _score_shard(task):
+    return BatchScorer._ScoreShard(_MODEL, *task)
+
+def _write_columnar(df, path):
+    #parquet needs pyarrow or fastparquet, fall back to csv without them
+    try:
+        df.to_parquet(path + '.parquet', index=False)
+        return path + '.parquet'
+    except ImportError:
+        warnings.warn("No parquet engine installed, writing csv instead")
+        df.to_csv(path + '.csv', index=False)
+        return path + '.csv'
+
+class BatchScorer:
+    #Scores the cars corpus sharded by model year and the hotels corpus
+    #sharded by city with a trained model artifact: a pickled estimator
+    #taking raw review text, e.g. a TfidfVectorizer -> classifier Pipeline
+    #(see SaveModel). sources maps a source name to its data folder
+    def __init__(self, modelpath, sources=None, batch_size=1000):
+        self.modelpath, self.batch_size = modelpath, batch_size
+        self.sources = sources or {'cars': r'data/cars/data',
+                                   'hotels': r'data/hotels/data'}
+
+    #Wrap a fitted vectorizer and classifier into one artifact
+    @staticmethod
+    def SaveModel(modelpath, vectorizer, clf):
+        from sklearn.pipeline import Pipeline
+        with open(modelpath, 'wb') as fo:
+            pickle.dump(Pipeline([('vectorizer', vectorizer), ('clf', clf)]),
+                        fo, protocol=2)
+
+    #{(source, datapath, shard): bytes of review files}
+    def ShardSizes(self, shards=None):
+        corpus = Corpus()
+        sizes = {}
+        for source in sorted(self.sources):
+            for shard, entity, path in corpus.IterFiles(self.sources[source],
+                                                        shards):
+                key = (source, self.sources[source], shard)
+                sizes[key] = sizes.get(key, 0) + os.path.getsize(path)
+        return sizes
+
+    #One task per (source, shard), largest shards first so a big city
+    #doesn't start last and hold up the whole run
+    def Shards(self, shards=None):
+        sizes = self.ShardSizes(shards)
+        return sorted(sizes, key=lambda key: (-sizes[key], key))
+
+    #Score every review of one shard. Writes the per-review predictions and
+    #the per-entity summary, then the stats file last; files are written
+    #under a temporary name and renamed so a killed run never leaves a
+    #partial shard behind that looks finished
+    @staticmethod
+    def _ScoreShard(model, source, datapath, shard, outpath, batch_size):
+        time0 = time.time()
+        corpus = Corpus()
+        reader = {'cars': corpus.IterEdmunds,
+                  'hotels': corpus.IterTripAdvisor}[source]
+        #older Pipelines don't expose classes_ of their last step
+        classes = list(model.steps[-1][1].classes_ if hasattr(model, 'steps')
+                       else model.classes_)
+        doc_ids, numbers, probs = [], [], []
+        texts, previous, number = [], None, 0
+
+        def flush():
+            proba = model.predict_proba(texts)
+            probs.extend(proba[:, classes.index(True) if True in classes
+                               else -1])
+            del texts[:]
+
+        for shard_, entity, review in reader(datapath, [shard]):
+            number = number + 1 if entity == previous else 0
+            previous = entity
+            doc_ids.append(entity)
+            numbers.append(number)
+            #same preprocessing as LoadData
+            texts.append(review.replace("'", ""))
+            if len(texts) == batch_size:
+                flush()
+        if texts:
+            flush()
+        reviews = pd.DataFrame({'source': source, 'shard': shard,
+                                'doc_id': doc_ids, 'review': numbers,
+                                'probability': np.array(probs,
+                                                        dtype=np.float32)})
+        reviews['prediction'] = reviews['probability'] >= 0.5
+        grouped = reviews.groupby('doc_id')
+        entities = pd.DataFrame({
+            'num_reviews': grouped.size(),
+            'mean_probability': grouped['probability'].mean(),
+            'positive_share': grouped['prediction'].mean()}).reset_index()
+        entities.insert(0, 'shard', shard)
+        entities.insert(0, 'source', source)
+        name = '{}_{}'.format(source, shard)
+        for folder, df in [('reviews', reviews), ('entities', entities)]:
+            tmp = _write_columnar(df, os.path.join(outpath, folder,
+                                                   '.' + name))
+            os.rename(tmp, os.path.join(outpath, folder, name +
+                                        os.path.splitext(tmp)[1]))
+        stats = {'source': source, 'shard': shard, 'docs': len(reviews),
+                 'seconds': time.time() - time0, 'pid': os.getpid()}
+        with open(os.path.join(outpath, 'stats', '.' + name), 'w') as fo:
+            json.dump(stats, fo)
+        os.rename(os.path.join(outpath, 'stats', '.' + name),
+                  os.path.join(outpath, 'stats', name + '.json'))
+        return stats
+
+    #Score every shard on a pool of n_jobs processes, one shard per task.
+    #Shards whose stats file exists were finished by an earlier run and are
+    #skipped unless resume=False. Returns the per shard stats
+    def Run(self, outpath, n_jobs=1, shards=None, resume=True):
+        for folder in ['reviews', 'entities', 'stats']:
+            if not os.path.exists(os.path.join(outpath, folder)):
+                os.makedirs(os.path.join(outpath, folder))
+        tasks, done = [], []
+        for source, datapath, shard in self.Shards(shards):
+            statpath = os.path.join(outpath, 'stats',
+                                    '{}_{}.json'.format(source, shard))
+            if resume and os.path.exists(statpath):
+                with open(statpath, 'r') as fo:
+                    done.append(json.load(fo))
+                continue
+            tasks.append((source, datapath, shard, outpath, self.batch_size))
+        time0 = time.time()
+        pool = Pool(n_jobs, initializer=_init_worker,
+                    initargs=(self.modelpath,))
+        try:
+            stats = list(pool.imap_unordered(_score_shard, tasks))
+        finally:
+            pool.close()
+            pool.join()
+        self.wall_ = time.time() - time0
+        self.skipped_ = len(done)
+        return done + stats
+
+    #docs/sec per worker process and overall for the shards scored by this
+    #run (resumed shards have no wall time in this run)
+    def Report(self, stats):
+        df = pd.DataFrame(stats, columns=['source', 'shard', 'docs',
+                                          'seconds', 'pid'])
+        df = df.tail(len(df) - self.skipped_)
+        workers = df.groupby('pid').agg({'docs': 'sum', 'seconds': 'sum'})
+        workers['docs_per_sec'] = workers['docs'] / workers['seconds']
+        overall = df['docs'].sum() / self.wall_ if self.wall_ else np.nan
+        return workers, overall
+
+    #Scaling from 1 to max_jobs cores on the given shards: every run starts
+    #from scratch in a temporary folder. efficiency = speedup / n_jobs.
+    #A shard is one task, so n_jobs beyond the number of shards only adds
+    #idle workers and max_jobs is capped at it; the largest shard also
+    #bounds the speedup at total size / largest shard size (max_speedup).
+    #Scale over enough shards to keep every worker busy, e.g. all of them
+    def Scaling(self, max_jobs, shards=None):
+        sizes = self.ShardSizes(shards)
+        if max_jobs > len(sizes):
+            warnings.warn("{} shards can keep at most {} workers busy".format(
+                len(sizes), len(sizes)))
+            max_jobs = len(sizes)
+        n_list = sorted(set([1] + [n for n in [2, 4, 8, 16, 32, 64]
+                                   if n < max_jobs] + [max_jobs]))
+        bound = float(sum(sizes.values())) / max(sizes.values())
+        rows = []
+        for n_jobs in n_list:
+            outpath = tempfile.mkdtemp()
+            try:
+                stats = self.Run(outpath, n_jobs, shards, resume=False)
+            finally:
+                shutil.rmtree(outpath)
+            docs = sum(stat['docs'] for stat in stats)
+            rows.append({'n_jobs': n_jobs, 'tasks': len(sizes), 'docs': docs,
+                         'seconds': self.wall_,
+                         'docs_per_sec': docs / self.wall_,
+                         'max_speedup': min(n_jobs, bound)})
+        df = pd.DataFrame(rows, columns=['n_jobs', 'tasks', 'docs', 'seconds',
+                                         'docs_per_sec', 'max_speedup'])
+        df['speedup'] = df['docs_per_sec'] / df['docs_per_sec'].iloc[0]
+        df['efficiency'] = df['speedup'] / df['n_jobs']
+        return df
+
+if __name__ == '__main__':
+    from multiprocessing import cpu_count
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    #train the Bing Liu lexicon model on txt_sentoken
+    review_list, opinion_list = [], []
+    for label in ['neg', 'pos']:
+        path = os.path.join(r'data/txt_sentoken', label)
+        for name in sorted(os.listdir(path)):
+            with open(os.path.join(path, name), 'r') as fo:
+                review_list.append(fo.read().replace("'", ""))
+            opinion_list.append(label == 'pos')
+    lexicon = Corpus().ReadBingLiu(r'data/sentiment')
+    vectorizer = TfidfVectorizer(decode_error='replace',
+                                 strip_accents='unicode',
+                                 vocabulary=sorted(lexicon), lowercase=True)
+    clf = LogisticRegression().fit(vectorizer.fit_transform(review_list),
+                                   opinion_list)
+    BatchScorer.SaveModel(r'bingliu_model.pkl', vectorizer, clf)
+
+    scorer = BatchScorer(r'bingliu_model.pkl')
+    stats = scorer.Run(r'scores', n_jobs=cpu_count())
+    workers, overall = scorer.Report(stats)
+    print(workers)
+    print('{:.0f} docs/sec overall'.format(overall))
+    #every year and city so there are enough tasks for the workers
+    print(scorer.Scaling(cpu_count()))
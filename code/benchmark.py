@@ -0,0 +1,324 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import time
+import timeit
+
+import numpy as np
+from scipy import stats
+
+from code.corpus import Corpus
+
+DATAPATH = 'data'
+#Registered benchmarks, (suite, name, setup); setup does the untimed work
+#and returns the zero argument callable that is timed
+BENCHMARKS = []
+
+def benchmark(suite, name):
+    def register(setup):
+        BENCHMARKS.append((suite, name, setup))
+        return setup
+    return register
+
+#Setup data shared between benchmarks, loaded once per process
+_CACHE = {}
+
+def _movie_reviews():
+    if 'movies' not in _CACHE:
+        review, opinion = [], []
+        for label in ['neg', 'pos']:
+            path = os.path.join(DATAPATH, 'txt_sentoken', label)
+            for name in sorted(os.listdir(path)):
+                with open(os.path.join(path, name), 'r') as fo:
+                    review.append(fo.read().replace("'", ""))
+                opinion.append(label == 'pos')
+        _CACHE['movies'] = review, np.array(opinion)
+    return _CACHE['movies']
+
+def _signed_features(review_list):
+    #Bing Liu TFIDF with the negative lexicon columns flipped, as in the
+    #Bing Liu notebook
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    lexicon = Corpus().ReadBingLiu(os.path.join(DATAPATH, 'sentiment'))
+    words = sorted(lexicon)
+    vectorizer = TfidfVectorizer(decode_error='replace',
+                                 strip_accents='unicode', vocabulary=words,
+                                 lowercase=True)
+    X = vectorizer.fit_transform(review_list).tocsr()
+    signs = np.array([lexicon[word] for word in words], dtype=X.dtype)
+    X.data *= signs[X.indices]
+    return X
+
+def _movie_features():
+    if 'features' not in _CACHE:
+        review_list, opinion = _movie_reviews()
+        _CACHE['features'] = _signed_features(review_list), opinion
+    return _CACHE['features']
+
+def _car_reviews():
+    if 'cars' not in _CACHE:
+        _CACHE['cars'] = [review for year, vehicle, review in
+                          Corpus().IterEdmunds(os.path.join(DATAPATH, 'cars',
+                                                            'data'))]
+    return _CACHE['cars']
+
+def _initialize_nmf():
+    #private helper that moved between scikit-learn releases
+    try:
+        from sklearn.decomposition._nmf import _initialize_nmf
+        return lambda X, k: _initialize_nmf(X, k, init='nndsvd')
+    except ImportError:
+        from sklearn.decomposition.nmf import _initialize_nmf
+        return lambda X, k: _initialize_nmf(X, k)
+
+@benchmark('micro', 'lexicon_load')
+def _lexicon_load():
+    corpus = Corpus()
+    sentimentpath = os.path.join(DATAPATH, 'sentiment')
+    def run():
+        corpus.ReadBingLiu(sentimentpath)
+        corpus.ReadMPQA(os.path.join(sentimentpath,
+                                     'subjclueslen1-HLTEMNLP05.tff'))
+    return run
+
+@benchmark('micro', 'review_parse')
+def _review_parse():
+    corpus = Corpus()
+    path = os.path.join(DATAPATH, 'cars', 'data', '2007', '2007_acura_mdx')
+    return lambda: list(corpus.IterEdmundsFile(path))
+
+class _InMemoryClient:
+    #MongoClient stand-in so LoadData's file loops can be timed without a
+    #MongoDB server; client[dbname][collname] is an InMemoryCollection
+    def __init__(self):
+        self.dbs = {}
+
+    def __getitem__(self, dbname):
+        return self.dbs.setdefault(dbname, _InMemoryDatabase())
+
+class _InMemoryDatabase(dict):
+    def __missing__(self, collname):
+        from code.pipeline import InMemoryCollection
+        self[collname] = InMemoryCollection()
+        return self[collname]
+
+#Time a LoadData method with MongoClient patched to the in memory client
+def _load_data(method, *args):
+    from code import load_data
+    loader = load_data.LoadData()
+    def run():
+        client = load_data.MongoClient
+        load_data.MongoClient = _InMemoryClient
+        try:
+            getattr(loader, method)(*args)
+        finally:
+            load_data.MongoClient = client
+    return run
+
+@benchmark('micro', 'loaddata_bingliu')
+def _loaddata_bingliu():
+    return _load_data('LoadBingLiuSentiment',
+                      os.path.join(DATAPATH, 'sentiment'), 'sentiment',
+                      'bingliu')
+
+@benchmark('micro', 'loaddata_movies')
+def _loaddata_movies():
+    return _load_data('LoadData', os.path.join(DATAPATH, 'txt_sentoken'),
+                      'reviews', 'movies')
+
+@benchmark('micro', 'nndsvd_init_k16')
+def _nndsvd_init():
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    X = TfidfVectorizer(max_features=1000, stop_words='english')\
+        .fit_transform(_movie_reviews()[0])
+    initialize = _initialize_nmf()
+    return lambda: initialize(X, 16)
+
+@benchmark('micro', 'logit_fit_lbfgs')
+def _logit_lbfgs():
+    from sklearn.linear_model import LogisticRegression
+    X, y = _movie_features()
+    return lambda: LogisticRegression(solver='lbfgs').fit(X, y)
+
+@benchmark('micro', 'logit_fit_liblinear')
+def _logit_liblinear():
+    from sklearn.linear_model import LogisticRegression
+    X, y = _movie_features()
+    return lambda: LogisticRegression(solver='liblinear').fit(X, y)
+
+@benchmark('macro', 'bingliu_pipeline')
+def _bingliu_pipeline():
+    from sklearn.linear_model import LogisticRegression
+    try:
+        from sklearn.model_selection import cross_val_score
+    except ImportError:
+        from sklearn.cross_validation import cross_val_score
+    review_list, opinion = _movie_reviews()
+    def run():
+        X = _signed_features(review_list)
+        cross_val_score(LogisticRegression(), X, opinion, cv=5,
+                        scoring='accuracy')
+    return run
+
+@benchmark('macro', 'nmf_cars')
+def _nmf_cars():
+    from sklearn.decomposition import NMF
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    cartext = _car_reviews()
+    def run():
+        text_tfidf = TfidfVectorizer(max_features=1000, stop_words='english')\
+            .fit_transform(cartext)
+        NMF(n_components=16, init='nndsvd').fit(text_tfidf)
+    return run
+
+class Benchmark:
+    #history is a JSON lines file, one record per benchmark per run
+    def __init__(self, history='bench_history.jsonl'):
+        self.history = history
+
+    #Time fn repeat times after warmup untimed calls; the garbage collector
+    #is off while timing like timeit
+    def Time(self, fn, repeat, warmup):
+        for i in range(warmup):
+            fn()
+        times = []
+        for i in range(repeat):
+            gc.collect()
+            gcold = gc.isenabled()
+            gc.disable()
+            try:
+                time0 = timeit.default_timer()
+                fn()
+                times.append(timeit.default_timer() - time0)
+            finally:
+                if gcold:
+                    gc.enable()
+        return times
+
+    def Environment(self):
+        try:
+            with open(os.devnull, 'w') as devnull:
+                commit = subprocess.check_output(
+                    ['git', 'rev-parse', '--short', 'HEAD'],
+                    stderr=devnull).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {'commit': commit, 'python': platform.python_version(),
+                'numpy': np.__version__, 'machine': platform.node()}
+
+    #Run the selected suites (micro and/or macro) and append the results to
+    #the history file. Returns the run id
+    def Run(self, suites=('micro', 'macro'), names=None, repeat=5, warmup=1,
+            label=None):
+        run_id = time.strftime('%Y%m%dT%H%M%S')
+        env = self.Environment()
+        with open(self.history, 'a') as fo:
+            for suite, name, setup in BENCHMARKS:
+                if suite not in suites or (names and name not in names):
+                    continue
+                #a benchmark that can't be set up or run here (e.g.
+                #load_data.py is Python 2 only and builds Windows paths)
+                #is reported and skipped instead of aborting the run
+                try:
+                    times = self.Time(setup(), repeat, warmup)
+                except Exception as e:
+                    reason = '{}: {}'.format(type(e).__name__, e)
+                    fo.write(json.dumps(dict(
+                        env, run=run_id, label=label, suite=suite, name=name,
+                        times=[], skipped=reason)) + '\n')
+                    print('{:<8}{:<24}skipped: {}'.format(suite, name, reason))
+                    continue
+                record = dict(env, run=run_id, label=label, suite=suite,
+                              name=name, times=times)
+                fo.write(json.dumps(record) + '\n')
+                print('{:<8}{:<24}median {:.4f}s  min {:.4f}s  (n={})'.format(
+                    suite, name, np.median(times), min(times), len(times)))
+        return run_id
+
+    #{run id or label: {benchmark name: [times]}} from the history file and
+    #{run id or label: set of run ids it refers to}; skipped benchmarks are
+    #left out
+    def Load(self):
+        runs, ids = {}, {}
+        with open(self.history, 'r') as fo:
+            for line in fo:
+                record = json.loads(line)
+                if record.get('skipped'):
+                    continue
+                for key in set([record['run'], record.get('label')]):
+                    if key is not None:
+                        runs.setdefault(key, {})[record['name']] = \
+                            record['times']
+                        ids.setdefault(key, set()).add(record['run'])
+        return runs, ids
+
+    #Compare run against baseline (run ids or labels, run defaults to the
+    #latest run that isn't the baseline). A benchmark is flagged as a
+    #slowdown when the one sided Welch t-test on log times is significant at
+    #alpha and the median is at least min_change slower
+    def Compare(self, baseline, run=None, alpha=0.05, min_change=0.05):
+        runs, ids = self.Load()
+        if baseline not in runs:
+            raise ValueError("Unknown baseline run id or label: %s" % baseline)
+        if run is None:
+            #run ids are timestamps, labels are whatever the user chose
+            latest = [key for key in runs if key[:1].isdigit() and
+                      key not in ids[baseline]]
+            if not latest:
+                raise ValueError("No run to compare besides the baseline")
+            run = max(latest)
+        elif run not in runs:
+            raise ValueError("Unknown run id or label: %s" % run)
+        rows = []
+        for name in sorted(set(runs[baseline]) & set(runs[run])):
+            base, current = np.log(runs[baseline][name]), \
+                np.log(runs[run][name])
+            change = np.exp(np.median(current) - np.median(base)) - 1
+            if len(base) > 1 and len(current) > 1:
+                t, p = stats.ttest_ind(current, base, equal_var=False)
+                #one sided: is the current run slower
+                p = p / 2 if t > 0 else 1 - p / 2
+            else:
+                p = np.nan
+            rows.append((name, change, p,
+                         bool(p < alpha and change >= min_change)))
+        for name, change, p, slower in rows:
+            print('{:<24}{:+8.1%}  p={:.3f}  {}'.format(
+                name, change, p, 'SLOWER' if slower else ''))
+        return rows
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run or compare benchmarks')
+    parser.add_argument('--history', default='bench_history.jsonl')
+    commands = parser.add_subparsers(dest='command')
+    run = commands.add_parser('run', help='run benchmarks')
+    run.add_argument('--suite', action='append', choices=['micro', 'macro'])
+    run.add_argument('--name', action='append')
+    run.add_argument('--repeat', type=int, default=5)
+    run.add_argument('--warmup', type=int, default=1)
+    run.add_argument('--label')
+    compare = commands.add_parser('compare', help='compare against a baseline')
+    compare.add_argument('--baseline', required=True,
+                         help='run id or label to compare against')
+    compare.add_argument('--run', help='run id or label, defaults to the '
+                         'latest run that is not the baseline')
+    compare.add_argument('--alpha', type=float, default=0.05)
+    args = parser.parse_args()
+    bench = Benchmark(args.history)
+    if args.command == 'run':
+        bench.Run(args.suite or ('micro', 'macro'), args.name, args.repeat,
+                  args.warmup, args.label)
+    elif args.command == 'compare':
+        #usage errors exit 2 so they can't be mistaken for a slowdown (1)
+        try:
+            rows = bench.Compare(args.baseline, args.run, args.alpha)
+        except (ValueError, IOError) as e:
+            compare.error(str(e))
+        slower = [row for row in rows if row[3]]
+        #non-zero exit so CI can fail on a regression
+        raise SystemExit(1 if slower else 0)
+    else:
+        parser.error('choose a command: run or compare')
@@ -0,0 +1,145 @@
+import csv
+import io
+import os
+import re
+from collections import Counter
+
+#Matches everything between the opening and closing tag of an Edmunds field
+#DOTALL because a handful of reviews wrap their TEXT over several lines
+EDMUNDS_FIELD = re.compile(r'<(TEXT|FAVORITE)>(.*?)</\1>', re.DOTALL)
+#Word tokens once apostrophes have been stripped
+TOKEN = re.compile(r'\w+', re.UNICODE)
+
+class Corpus:
+    def __init__(self):
+        pass
+
+    #Same tokenization the loaders and vectorizers use; lower case and remove
+    #apostrophes so that contractions are treated as one word
+    def Tokenize(self, text):
+        return TOKEN.findall(text.lower().replace("'", ""))
+
+    #Yield (shard, entity, path) for every review file under an Edmunds or
+    #TripAdvisor data folder. Shard is the year or city folder, entity is
+    #the file name which is also the docid/doc_id key of the rating CSVs
+    def IterFiles(self, datapath, shards=None):
+        for shard in sorted(os.listdir(datapath)):
+            shardpath = os.path.join(datapath, shard)
+            #skip the rating CSVs sitting next to the shard folders
+            if not os.path.isdir(shardpath):
+                continue
+            if shards is not None and shard not in shards:
+                continue
+            for name in sorted(os.listdir(shardpath)):
+                path = os.path.join(shardpath, name)
+                #break for the folder containing bad data files
+                if os.path.isdir(path):
+                    continue
+                yield shard, name, path
+
+    #Yield one review text at a time from an Edmunds file. Reviews are
+    #<DOC> blocks with TEXT and FAVORITE fields, the text of both is returned
+    def IterEdmundsFile(self, path):
+        with io.open(path, 'r', encoding='cp1252', errors='replace') as fo:
+            block = []
+            for line in fo:
+                if line.startswith('<DOC>'):
+                    block = []
+                elif line.startswith('</DOC>'):
+                    fields = EDMUNDS_FIELD.findall(''.join(block))
+                    if fields:
+                        yield ' '.join(text for tag, text in fields)
+                else:
+                    block.append(line)
+
+    #Yield one review text at a time from a TripAdvisor file. Each line is
+    #date<TAB>title<TAB>review<TAB>, title and review are returned
+    def IterTripAdvisorFile(self, path):
+        with io.open(path, 'r', encoding='cp1252', errors='replace') as fo:
+            for line in fo:
+                fields = line.split('\t')
+                if len(fields) < 3:
+                    continue
+                yield fields[1] + ' ' + fields[2]
+
+    #Yield (shard, entity, review) for the whole Edmunds corpus (shard = year)
+    def IterEdmunds(self, datapath, shards=None):
+        for shard, entity, path in self.IterFiles(datapath, shards):
+            for review in self.IterEdmundsFile(path):
+                yield shard, entity, review
+
+    #Yield (shard, entity, review) for the whole TripAdvisor corpus (shard = city)
+    def IterTripAdvisor(self, datapath, shards=None):
+        for shard, entity, path in self.IterFiles(datapath, shards):
+            for review in self.IterTripAdvisorFile(path):
+                yield shard, entity, review
+
+    #Yield (shard, row) for every row of the rating CSVs (<shard>.csv next to
+    #the shard folders); row maps the lower case column names to the raw
+    #string values
+    def IterRatings(self, datapath, shards=None):
+        for name in sorted(os.listdir(datapath)):
+            shard, ext = os.path.splitext(name)
+            if ext != '.csv' or (shards is not None and shard not in shards):
+                continue
+            with io.open(os.path.join(datapath, name), 'r',
+                         encoding='cp1252') as fo:
+                records = list(csv.reader(fo))
+            header = [column.lower() for column in records[0]]
+            #the TripAdvisor header runs overall_rating and source together
+            if 'overall_ratingsource' in header:
+                i = header.index('overall_ratingsource')
+                header[i:i + 1] = ['overall_rating', 'source']
+            records = records[1:]
+            #a few hotel addresses contain an unquoted comma, every field
+            #after it is shifted right compared to the usual row length
+            width = Counter(len(record) for record in records).most_common(1)
+            width = width[0][0] if width else len(header)
+            for record in records:
+                shift = len(record) - width
+                row = {header[0]: record[0]}
+                for i, column in enumerate(header[1:], 1):
+                    if 0 <= i + shift < len(record):
+                        row[column] = record[i + shift]
+                yield shard, row
+
+    #Read an aspect seed file into an {aspect: [phrase, ...]} dict
+    #Lines are aspect<TAB>comma separated phrases, '#' lines are headers
+    def ReadSeeds(self, path):
+        seeds = {}
+        with io.open(path, 'r', encoding='cp1252') as fo:
+            for line in fo:
+                if line.startswith('#') or '\t' not in line:
+                    continue
+                aspect, phrases = line.split('\t', 1)
+                seeds[aspect.strip()] = [phrase.strip() for phrase in
+                                         phrases.split(',') if phrase.strip()]
+        return seeds
+
+    #Read Bing Liu's lexicons into a {word: 1 | -1} dict, words that appear in
+    #both the positive and negative lexicon are dropped like LoadBingLiuSentiment
+    def ReadBingLiu(self, sentimentpath):
+        pos, neg = set(), set()
+        for name, words in [('positive-words.txt', pos),
+                            ('negative-words.txt', neg)]:
+            with io.open(os.path.join(sentimentpath, name), 'r',
+                         encoding='cp1252') as fo:
+                words.update(line.strip() for line in fo
+                             if line.strip() and not line.startswith(';'))
+        lexicon = dict((word, 1) for word in pos - neg)
+        lexicon.update((word, -1) for word in neg - pos)
+        return lexicon
+
+    #Read the MPQA lexicon into a {word: 1 | -1} dict, neutral and both
+    #polarity entries are left out
+    def ReadMPQA(self, path):
+        polarity = {'positive': 1, 'negative': -1}
+        lexicon = {}
+        with io.open(path, 'r', encoding='cp1252') as fo:
+            for line in fo:
+                fields = dict(field.split('=', 1) for field in line.split()
+                              if '=' in field)
+                score = polarity.get(fields.get('priorpolarity'))
+                if score is not None and 'word1' in fields:
+                    lexicon[fields['word1']] = score
+        return lexicon
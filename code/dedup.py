@@ -0,0 +1,172 @@
+import hashlib
+import os
+import zlib
+from collections import Counter, defaultdict
+from multiprocessing import Pool
+
+import numpy as np
+
+from code.corpus import Corpus
+
+#Mersenne prime for the universal hash family h(x) = (a*x + b) mod p
+#a, b < p and x < 2**32 so a*x + b never overflows uint64
+PRIME = np.uint64((1 << 31) - 1)
+
+#Permutation parameters shared with the worker processes
+_DEDUP = None
+
+def _init_worker(dedup):
+    global _DEDUP
+    _DEDUP = dedup
+
+def _signature(text):
+    return _DEDUP.Signature(text)
+
+class MinHashDedup:
+    #num_perm hash functions split into bands of num_perm/bands rows; two
+    #documents become candidates when all rows of any band agree and are
+    #duplicates when their estimated Jaccard similarity >= threshold.
+    #mode 'drop' removes duplicates, 'tag' keeps them and marks the original.
+    #sigpath (.npz) persists signatures so later loads only hash new texts
+    def __init__(self, threshold=0.8, num_perm=128, bands=32, shingle=3,
+                 mode='drop', sigpath=None, n_jobs=1, random_state=0):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        if mode not in ('drop', 'tag'):
+            raise ValueError("Invalid mode name")
+        self.threshold, self.num_perm, self.bands = threshold, num_perm, bands
+        #np.savez appends .npz, load from the same name it saves to
+        if sigpath is not None and not sigpath.endswith('.npz'):
+            sigpath += '.npz'
+        self.shingle, self.mode, self.sigpath = shingle, mode, sigpath
+        self.n_jobs = n_jobs
+        self.corpus = Corpus()
+        rng = np.random.RandomState(random_state)
+        self.a = rng.randint(1, int(PRIME), num_perm).astype(np.uint64)
+        self.b = rng.randint(0, int(PRIME), num_perm).astype(np.uint64)
+        self.signatures = self.LoadSignatures()
+
+    #Word shingles of a review hashed to 32 bits
+    def Shingles(self, text):
+        tokens = self.corpus.Tokenize(text)
+        k = min(self.shingle, len(tokens))
+        shingles = set(' '.join(tokens[i:i + k])
+                       for i in range(len(tokens) - k + 1))
+        return np.array([zlib.crc32(s.encode('utf8')) & 0xffffffff
+                         for s in shingles], dtype=np.uint64)
+
+    #MinHash signature: the minimum of every hash function over the shingles
+    def Signature(self, text):
+        x = self.Shingles(text)
+        if not len(x):
+            return np.full(self.num_perm, PRIME, dtype=np.uint64)
+        return ((np.outer(self.a, x) + self.b[:, None]) % PRIME).min(axis=1)
+
+    #Signatures are keyed by a digest of the text so they survive reloads
+    #regardless of file names or insertion order
+    def Key(self, text):
+        return hashlib.sha1(text.encode('utf8')).hexdigest()
+
+    def LoadSignatures(self):
+        if self.sigpath is None or not os.path.exists(self.sigpath):
+            return {}
+        store = np.load(self.sigpath)
+        #signatures hashed with other parameters can't be compared
+        if store['a'].shape != self.a.shape or (store['a'] != self.a).any() \
+                or int(store['shingle']) != self.shingle:
+            return {}
+        return dict(zip(store['keys'], store['signatures']))
+
+    def SaveSignatures(self):
+        if self.sigpath is None:
+            return
+        keys = sorted(self.signatures)
+        signatures = np.array([self.signatures[key] for key in keys],
+                              dtype=np.uint64).reshape(-1, self.num_perm)
+        np.savez(self.sigpath, keys=np.array(keys), signatures=signatures,
+                 a=self.a, shingle=self.shingle)
+
+    #Signature matrix (documents x num_perm), only texts missing from the
+    #store are hashed, on a process pool when n_jobs > 1
+    def Signatures(self, texts):
+        keys = [self.Key(text) for text in texts]
+        new = dict((key, text) for key, text in zip(keys, texts)
+                   if key not in self.signatures)
+        if new:
+            new_keys = list(new)
+            if self.n_jobs == 1:
+                hashed = [self.Signature(new[key]) for key in new_keys]
+            else:
+                pool = Pool(self.n_jobs, initializer=_init_worker,
+                            initargs=(self,))
+                try:
+                    hashed = pool.map(_signature, [new[key] for key in
+                                                   new_keys], chunksize=100)
+                finally:
+                    pool.close()
+                    pool.join()
+            self.signatures.update(zip(new_keys, hashed))
+            self.SaveSignatures()
+        return np.array([self.signatures[key] for key in keys],
+                        dtype=np.uint64).reshape(-1, self.num_perm), len(new)
+
+    #Estimated Jaccard similarity of two signatures is at least threshold
+    def Similar(self, a, b):
+        return (a == b).mean() >= self.threshold
+
+    #LSH banding: documents sharing every row of a band land in the same
+    #bucket. Within a bucket every member is compared with the bucket's
+    #representatives in order and paired with the first one it is similar
+    #to, otherwise it becomes a representative itself. A bucket of k reposts
+    #(or k empty reviews) costs k - 1 comparisons, and a chance collision
+    #at the head of a bucket can't hide the true duplicates behind it.
+    #Returns the similar pairs, union-find in Duplicates closes the chains
+    #across bands
+    def DuplicatePairs(self, signatures):
+        rows = self.num_perm // self.bands
+        pairs = set()
+        for band in range(self.bands):
+            buckets = defaultdict(list)
+            block = signatures[:, band * rows:(band + 1) * rows]
+            for i, row in enumerate(block):
+                buckets[row.tobytes()].append(i)
+            for bucket in buckets.values():
+                representatives = bucket[:1]
+                for j in bucket[1:]:
+                    for i in representatives:
+                        if self.Similar(signatures[i], signatures[j]):
+                            pairs.add((i, j))
+                            break
+                    else:
+                        representatives.append(j)
+        return pairs
+
+    #Return duplicate_of: -1 for originals, otherwise the index of the first
+    #document of its near-duplicate cluster
+    def Duplicates(self, texts):
+        signatures, hashed = self.Signatures(texts)
+        self.hashed_ = hashed
+        #union-find so chains of near duplicates collapse to one original
+        parent = list(range(len(texts)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j in self.DuplicatePairs(signatures):
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+        roots = np.array([find(i) for i in range(len(texts))], dtype=np.int64)
+        return np.where(roots == np.arange(len(texts)), -1, roots)
+
+    #Dedup a batch of texts tagged with their source (e.g. pos/neg, year or
+    #city). Returns duplicate_of and a {source: duplicates found} report
+    def Dedup(self, texts, sources):
+        duplicate_of = self.Duplicates(texts)
+        report = Counter(source for source, dup in zip(sources, duplicate_of)
+                         if dup >= 0)
+        return duplicate_of, dict((source, report.get(source, 0))
+                                  for source in sorted(set(sources)))
@@ -3,11 +3,17 @@ import numpy as np
 import os
 from pymongo import MongoClient
 
+from code.corpus import Corpus
+
 class LoadData:
     def __init__(self):
         pass
     
-    def LoadData(self, datapath, dbname, collname):
+    #dedup is an optional code.dedup.MinHashDedup; near duplicate reviews are
+    #dropped or tagged before insertion. Tagged rows all carry their own Key
+    #(MinHashDedup.Key digest) and duplicates the Key of their original in
+    #Duplicate (None for originals)
+    def LoadData(self, datapath, dbname, collname, dedup=None):
         #Path of data files
         pospath, negpath =  datapath+r'\pos', datapath+r'\neg'
         #PyMongo variables
@@ -44,8 +50,53 @@ class LoadData:
         
         df = pd.DataFrame(zip(review,opinion))
         df.columns = ['Review','Opinion']
+        #report removals per source folder
+        df, message = self._Dedup(df, np.where(df['Opinion'], 'pos', 'neg'),
+                                  dedup)
+        result = collection.insert(df.T.to_dict().values())
+        return "{} Review records loaded".format(collection.count()) + message
+
+    #Load the Edmunds (source 'cars', shard = year) or TripAdvisor (source
+    #'hotels', shard = city) reviews, one record per review keyed by the
+    #Shard and DocId of the rating CSVs. dedup works like LoadData's and
+    #reports removals per year or city
+    def LoadReviews(self, datapath, source, dbname, collname, dedup=None,
+                    shards=None):
+        corpus = Corpus()
+        reviews = {'cars': corpus.IterEdmunds,
+                   'hotels': corpus.IterTripAdvisor}[source]
+        #PyMongo variables
+        client = MongoClient()
+        db = client[dbname]
+        collection = db[collname]
+        #Drop the existing MongoDB data so duplicates aren't loaded
+        collection.drop()
+        #remove apostrophes like LoadData so contractions are one word
+        df = pd.DataFrame([(shard, entity, review.replace("'", ""))
+                           for shard, entity, review in reviews(datapath,
+                                                                shards)],
+                          columns=['Shard', 'DocId', 'Review'])
+        df, message = self._Dedup(df, df['Shard'].values, dedup)
         result = collection.insert(df.T.to_dict().values())
-        return "{} Review records loaded".format(collection.count())
+        return "{} Review records loaded".format(collection.count()) + message
+
+    #Drop or tag the near duplicate reviews of df with a MinHashDedup.
+    #Returns the frame and the per source report appended to the load message
+    def _Dedup(self, df, sources, dedup):
+        if dedup is None:
+            return df, ""
+        duplicate_of, report = dedup.Dedup(list(df['Review']), sources)
+        if dedup.mode == 'drop':
+            df = df[duplicate_of < 0]
+        else:
+            keys = [dedup.Key(text) for text in df['Review']]
+            df['Key'] = keys
+            df['Duplicate'] = [keys[i] if i >= 0 else None
+                               for i in duplicate_of]
+        message = ", {} duplicates {} ({} newly hashed)".format(
+            ", ".join("{}: {}".format(k, v) for k, v in report.items()),
+            'removed' if dedup.mode == 'drop' else 'tagged', dedup.hashed_)
+        return df, message
 
     def LoadBingLiuSentiment(self, sentimentpath, dbname, collname):
         #Path of data files
@@ -115,4 +166,7 @@ if __name__ == '__main__':
     loader = LoadData()
     print loader.LoadData(r"C:\Anaconda\Galvanize\Minimester2-Project\data\txt_sentoken", 'reviews', 'movies')
     print loader.LoadBingLiuSentiment(r"C:\Anaconda\Galvanize\Minimester2-Project\data\sentiment", 'sentiment', 'bingliu')
-    print loader.LoadMPQASentiment(r"C:\Anaconda\Galvanize\Minimester2-Project\data\sentiment\subjclueslen1-HLTEMNLP05.tff", 'sentiment', 'mpqa')
\ No newline at end of file
+    print loader.LoadMPQASentiment(r"C:\Anaconda\Galvanize\Minimester2-Project\data\sentiment\subjclueslen1-HLTEMNLP05.tff", 'sentiment', 'mpqa')
+    from code.dedup import MinHashDedup
+    print loader.LoadReviews(r"C:\Anaconda\Galvanize\Minimester2-Project\data\cars\data", 'cars', 'reviews', 'cars', MinHashDedup(sigpath='cars_signatures'))
+    print loader.LoadReviews(r"C:\Anaconda\Galvanize\Minimester2-Project\data\hotels\data", 'hotels', 'reviews', 'hotels', MinHashDedup(sigpath='hotels_signatures'))
\ No newline at end of file
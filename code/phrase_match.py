@@ -0,0 +1,191 @@
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+
+import numpy as np
+import scipy.sparse as sp
+
+from code.corpus import Corpus
+
+#Automaton shared with the worker processes, set once per worker by _init_worker
+_MATCHER = None
+
+def _init_worker(matcher):
+    global _MATCHER
+    _MATCHER = matcher
+
+def _scan_chunk(docs):
+    return _MATCHER._ScanChunk(docs)
+
+def _chunks(docs, chunksize):
+    docs = iter(docs)
+    while True:
+        chunk = list(islice(docs, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+class PhraseMatcher:
+    #phrases is a list of (phrase, group) pairs; group is the aspect name for
+    #seed phrases or the polarity for lexicon entries
+    def __init__(self, phrases):
+        self.corpus = Corpus()
+        #Phrases are tokenized exactly like the documents so hyphenated and
+        #compound entries (e.g. 2-faced, well-made) match token for token
+        self.phrases, self.groups, self.group_names = [], [], []
+        self.lengths = []
+        self.vocabulary = {}
+        group_index = {}
+        seen = set()
+        for phrase, group in phrases:
+            tokens = tuple(self.corpus.Tokenize(phrase))
+            if not tokens or (tokens, group) in seen:
+                continue
+            seen.add((tokens, group))
+            if group not in group_index:
+                group_index[group] = len(self.group_names)
+                self.group_names.append(group)
+            self.phrases.append(' '.join(tokens))
+            self.lengths.append(len(tokens))
+            self.groups.append(group_index[group])
+            for token in tokens:
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+        self._Build(phrases=[tuple(self.vocabulary[t] for t in phrase.split())
+                             for phrase in self.phrases])
+        #phrase -> group indicator, counts.dot(group_matrix) = group counts
+        self.group_matrix = sp.csr_matrix(
+            (np.ones(len(self.phrases), dtype=np.int32),
+             (np.arange(len(self.phrases)), self.groups)),
+            shape=(len(self.phrases), len(self.group_names)))
+
+    #Build the Aho-Corasick automaton over token ids. goto holds the trie
+    #edges of each state, fail the longest proper suffix state and out the
+    #ids of every phrase that ends in that state (own + inherited via fail)
+    def _Build(self, phrases):
+        self.goto, self.fail, self.out = [{}], [0], [[]]
+        for phrase_id, phrase in enumerate(phrases):
+            state = 0
+            for token_id in phrase:
+                if token_id not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[state][token_id] = len(self.goto) - 1
+                state = self.goto[state][token_id]
+            self.out[state].append(phrase_id)
+        #breadth first so the fail state of a parent is always resolved first
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token_id, child in self.goto[state].items():
+                queue.append(child)
+                fail = self.fail[state]
+                while fail and token_id not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[child] = self.goto[fail].get(token_id, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+        #tuples are cheaper to iterate in the scan loop
+        self.out = [tuple(out) for out in self.out]
+
+    #Build from an {aspect: [phrase, ...]} seed dict or seed file
+    @classmethod
+    def FromSeeds(cls, seeds):
+        if not isinstance(seeds, dict):
+            seeds = Corpus().ReadSeeds(seeds)
+        return cls([(phrase, aspect) for aspect in sorted(seeds)
+                    for phrase in seeds[aspect]])
+
+    #Build from a {word: polarity} lexicon such as Corpus.ReadBingLiu/ReadMPQA
+    @classmethod
+    def FromLexicon(cls, lexicon):
+        return cls(sorted(lexicon.items()))
+
+    #Return (end, phrase_id) for every phrase found in a token list, end is
+    #the index of the phrase's last token. None tokens never match so the
+    #caller can mask tokens out. Overlapping matches are all reported,
+    #"very comfortable" also counts "comfortable"
+    def MatchTokens(self, tokens):
+        goto, fail, out, vocabulary = self.goto, self.fail, self.out, \
+            self.vocabulary
+        matches = []
+        state = 0
+        for end, token in enumerate(tokens):
+            token_id = vocabulary.get(token)
+            #a token outside every phrase can't continue any match
+            if token_id is None:
+                state = 0
+                continue
+            while state and token_id not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token_id, 0)
+            for phrase_id in out[state]:
+                matches.append((end, phrase_id))
+        return matches
+
+    #Return the list of phrase ids found in one document
+    def Match(self, text):
+        return [phrase_id for end, phrase_id in
+                self.MatchTokens(self.corpus.Tokenize(text))]
+
+    #Scan a list of documents into the pieces of a CSR count matrix
+    def _ScanChunk(self, docs):
+        indptr, indices, data = [0], [], []
+        for text in docs:
+            counts = {}
+            for phrase_id in self.Match(text):
+                counts[phrase_id] = counts.get(phrase_id, 0) + 1
+            indices.extend(counts.keys())
+            data.extend(counts.values())
+            indptr.append(len(indices))
+        return (np.array(indptr, dtype=np.int64),
+                np.array(indices, dtype=np.int32),
+                np.array(data, dtype=np.int32))
+
+    #Scan every document once and return a sparse (document x phrase) count
+    #matrix. docs can be any iterable (e.g. a Corpus generator) so the corpus
+    #is never held in memory; n_jobs > 1 scans chunks on a process pool
+    def Transform(self, docs, n_jobs=1, chunksize=1000):
+        if n_jobs == 1:
+            parts = (self._ScanChunk(chunk) for chunk in
+                     _chunks(docs, chunksize))
+            return self._Stack(parts)
+        pool = Pool(n_jobs, initializer=_init_worker, initargs=(self,))
+        try:
+            #imap keeps the chunks in document order
+            return self._Stack(pool.imap(_scan_chunk,
+                                         _chunks(docs, chunksize)))
+        finally:
+            pool.close()
+            pool.join()
+
+    #Same as Transform but counts are summed into (document x group) columns
+    def TransformGroups(self, docs, n_jobs=1, chunksize=1000):
+        return self.Transform(docs, n_jobs, chunksize).dot(
+            self.group_matrix).tocsr()
+
+    def _Stack(self, parts):
+        indptrs, indices, data = [np.zeros(1, dtype=np.int64)], [], []
+        offset = 0
+        for part_indptr, part_indices, part_data in parts:
+            indptrs.append(part_indptr[1:] + offset)
+            indices.append(part_indices)
+            data.append(part_data)
+            offset += len(part_indices)
+        indptr = np.concatenate(indptrs)
+        indices = np.concatenate(indices) if indices else \
+            np.zeros(0, dtype=np.int32)
+        data = np.concatenate(data) if data else np.zeros(0, dtype=np.int32)
+        return sp.csr_matrix((data, indices, indptr),
+                             shape=(len(indptr) - 1, len(self.phrases)))
+
+if __name__ == '__main__':
+    import time
+    corpus = Corpus()
+    matcher = PhraseMatcher.FromSeeds(r'data/hotels/tripadvisor.seed')
+    time0 = time.time()
+    counts = matcher.TransformGroups((review for city, hotel, review in
+                                      corpus.IterTripAdvisor(r'data/hotels/data')),
+                                     n_jobs=4)
+    print('{} reviews scanned in {:.1f}s'.format(counts.shape[0],
+                                                 time.time()-time0))
+    print(dict(zip(matcher.group_names, np.asarray(counts.sum(axis=0))[0])))
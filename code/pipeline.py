@@ -0,0 +1,242 @@
+import numbers
+import threading
+import time
+from multiprocessing import Pool
+try:
+    from queue import Empty, Queue
+except ImportError:
+    from Queue import Empty, Queue
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+
+#Marks the end of the reader's batches on the queue
+_DONE = object()
+
+#Vectorizer shared with the worker processes, set once per worker
+_VECTORIZER = None
+
+def _init_worker(vectorizer):
+    global _VECTORIZER
+    _VECTORIZER = vectorizer
+
+def _count_batch(texts):
+    #fixed vocabulary: every batch has the same columns
+    if _VECTORIZER.vocabulary is not None:
+        return _VECTORIZER.transform(texts), None
+    #document frequency and max_features limits only make sense over the
+    #whole collection, they are applied after the batches are merged
+    params = dict(_VECTORIZER.get_params(), min_df=1, max_df=1.0,
+                  max_features=None)
+    vectorizer = CountVectorizer(**params)
+    try:
+        counts = vectorizer.fit_transform(texts)
+    except ValueError:
+        #empty vocabulary: the batch only has empty reviews or stop words
+        return sp.csr_matrix((len(texts), 0), dtype=_VECTORIZER.dtype), []
+    return counts, sorted(vectorizer.vocabulary_,
+                          key=vectorizer.vocabulary_.get)
+
+class InMemoryCollection:
+    #Local stand-in for a pymongo collection covering what the loaders and
+    #PipelinedVectorizer use: insert, find with projection, batch_size,
+    #count and drop
+    def __init__(self, docs=None):
+        self.docs = []
+        if docs is not None:
+            self.insert(docs)
+
+    def insert(self, docs):
+        if isinstance(docs, dict):
+            docs = [docs]
+        for doc in docs:
+            doc = dict(doc)
+            doc.setdefault('_id', len(self.docs))
+            self.docs.append(doc)
+
+    def find(self, spec=None, projection=None):
+        return InMemoryCursor(self.docs, spec or {}, projection)
+
+    def count(self):
+        return len(self.docs)
+
+    def drop(self):
+        self.docs = []
+
+class InMemoryCursor:
+    def __init__(self, docs, spec, projection):
+        self.docs, self.spec, self.projection = docs, spec, projection
+        self.batch = 101
+
+    def batch_size(self, batch):
+        self.batch = batch
+        return self
+
+    def __iter__(self):
+        fields = None
+        if self.projection:
+            fields = [k for k, v in self.projection.items() if v]
+            keep_id = self.projection.get('_id', 1)
+        for doc in self.docs:
+            if any(doc.get(k) != v for k, v in self.spec.items()):
+                continue
+            if fields is None:
+                yield dict(doc)
+            else:
+                out = dict((k, doc[k]) for k in fields if k in doc)
+                if keep_id:
+                    out['_id'] = doc['_id']
+                yield out
+
+class PipelinedVectorizer:
+    #Overlaps reading the review collection with tokenizing and counting.
+    #A reader thread pulls documents batch_size at a time (projected to
+    #Review/Opinion) onto a queue of at most queue_size batches, which blocks
+    #the reader when the workers fall behind. n_jobs worker processes count
+    #the batches, the partial count matrices are stacked in batch order and
+    #TFIDF weighted at the end. Vectorizer arguments are CountVectorizer's;
+    #min_df, max_df and max_features are applied to the merged counts
+    def __init__(self, batch_size=1000, n_jobs=2, queue_size=4, tfidf=True,
+                 text_field='Review', label_field='Opinion', **vectorizer):
+        self.batch_size, self.n_jobs = batch_size, n_jobs
+        self.queue_size, self.tfidf = queue_size, tfidf
+        self.text_field, self.label_field = text_field, label_field
+        self.vectorizer = CountVectorizer(**vectorizer)
+
+    #Reader thread: collection -> queue of (texts, labels) batches
+    def _Read(self, collection, queue, errors):
+        try:
+            cursor = collection.find({}, {self.text_field: 1,
+                                          self.label_field: 1, '_id': 0})
+            texts, labels = [], []
+            for doc in cursor.batch_size(self.batch_size):
+                texts.append(doc.get(self.text_field) or '')
+                labels.append(doc.get(self.label_field))
+                if len(texts) == self.batch_size:
+                    queue.put((texts, labels))
+                    texts, labels = [], []
+            if texts:
+                queue.put((texts, labels))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            queue.put(_DONE)
+
+    #Stack the partial count matrices; without a fixed vocabulary every
+    #batch has its own columns which are remapped into one sorted vocabulary
+    def _Merge(self, parts):
+        if self.vectorizer.vocabulary is not None:
+            self.vocabulary_ = self.vectorizer.vocabulary_
+            return sp.vstack([counts for counts, names in parts]).tocsr()
+        vocabulary = {}
+        remapped = []
+        for counts, names in parts:
+            mapping = np.array([vocabulary.setdefault(name, len(vocabulary))
+                                for name in names], dtype=np.int64)
+            counts = counts.tocsr()
+            remapped.append((counts.data, mapping[counts.indices],
+                             counts.indptr, counts.shape[0]))
+        names = sorted(vocabulary)
+        order = np.empty(len(names), dtype=np.int64)
+        order[[vocabulary[name] for name in names]] = np.arange(len(names))
+        matrices = [sp.csr_matrix((data, order[indices], indptr),
+                                  shape=(n, len(names)))
+                    for data, indices, indptr, n in remapped]
+        if not names:
+            raise ValueError("empty vocabulary; perhaps the documents only"
+                             " contain stop words")
+        self.vocabulary_ = dict((name, i) for i, name in enumerate(names))
+        X = sp.vstack(matrices).tocsr()
+        X.sort_indices()
+        return self._LimitFeatures(X)
+
+    #Apply min_df, max_df and max_features to the merged counts like
+    #CountVectorizer does over the whole collection: drop terms outside the
+    #document frequency range, then keep the max_features most frequent
+    def _LimitFeatures(self, X):
+        max_df, min_df = self.vectorizer.max_df, self.vectorizer.min_df
+        max_features = self.vectorizer.max_features
+        n_docs = X.shape[0]
+        high = max_df if isinstance(max_df, numbers.Integral) \
+            else max_df * n_docs
+        low = min_df if isinstance(min_df, numbers.Integral) \
+            else min_df * n_docs
+        if high < low:
+            raise ValueError("max_df corresponds to < documents than min_df")
+        dfs = np.bincount(X.indices, minlength=X.shape[1])
+        mask = (dfs <= high) & (dfs >= low)
+        if max_features is not None and mask.sum() > max_features:
+            tfs = np.asarray(X.sum(axis=0)).ravel()
+            #same ordering as CountVectorizer so ties keep the same terms
+            top = (-tfs[mask]).argsort()[:max_features]
+            keep = np.zeros(len(dfs), dtype=bool)
+            keep[np.where(mask)[0][top]] = True
+            mask = keep
+        if mask.all():
+            return X
+        if not mask.any():
+            raise ValueError("After pruning, no terms remain. Try a lower"
+                             " min_df or a higher max_df.")
+        names = sorted(self.vocabulary_, key=self.vocabulary_.get)
+        kept = np.where(mask)[0]
+        self.vocabulary_ = dict((names[j], i) for i, j in enumerate(kept))
+        return X[:, kept]
+
+    #Return the (TFIDF or count) feature matrix and label array of every
+    #document in the collection (pymongo or InMemoryCollection)
+    def FitTransform(self, collection):
+        time0 = time.time()
+        if self.vectorizer.vocabulary is not None:
+            #build vocabulary_ once so the workers only transform
+            self.vectorizer.fit([])
+        queue, errors = Queue(maxsize=self.queue_size), []
+        reader = threading.Thread(target=self._Read,
+                                  args=(collection, queue, errors))
+        reader.daemon = True
+        reader.start()
+        pool = Pool(self.n_jobs, initializer=_init_worker,
+                    initargs=(self.vectorizer,))
+        pending, labels = [], []
+        try:
+            while True:
+                batch = queue.get()
+                if batch is _DONE:
+                    break
+                texts, batch_labels = batch
+                labels.extend(batch_labels)
+                pending.append(pool.apply_async(_count_batch, (texts,)))
+                #keep at most two batches per worker in flight so the pool
+                #applies backpressure to the queue (and so the reader) too
+                while sum(not result.ready() for result in pending) >= \
+                        2 * self.n_jobs:
+                    pending[[result.ready() for result in pending]
+                            .index(False)].wait()
+            parts = [result.get() for result in pending]
+        finally:
+            pool.close()
+            pool.join()
+            #drain so a reader blocked on a full queue can finish if we
+            #stopped early
+            while reader.is_alive():
+                try:
+                    queue.get(timeout=0.1)
+                except Empty:
+                    pass
+        if errors:
+            raise errors[0]
+        X = self._Merge(parts)
+        if self.tfidf:
+            self.transformer_ = TfidfTransformer()
+            X = self.transformer_.fit_transform(X)
+        self.time_ = time.time() - time0
+        return X, np.array(labels)
+
+if __name__ == '__main__':
+    from pymongo import MongoClient
+    client = MongoClient()
+    vectorizer = PipelinedVectorizer(n_jobs=4, decode_error='replace',
+                                     strip_accents='unicode', lowercase=True)
+    X, y = vectorizer.FitTransform(client['reviews']['movies'])
+    print('{} x {} feature matrix in {:.1f}s'.format(X.shape[0], X.shape[1],
+                                                      vectorizer.time_))
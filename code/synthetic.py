@@ -0,0 +1,277 @@
+import io
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+from code.corpus import Corpus
+
+#Lower case words and sentence punctuation as separate tokens, so raw
+#Edmunds/TripAdvisor text is split like the pre-tokenized txt_sentoken files
+#and the generated reviews keep their sentence boundaries
+TOKEN = re.compile(r"\w+|[.!?,;]", re.UNICODE)
+
+class SyntheticCorpus:
+    #Labelled synthetic reviews for scaling tests. A bigram Markov chain per
+    #label is fit on real reviews; while sampling, lexicon_rate of the tokens
+    #are replaced with a word from the label's Bing Liu lexicon (weighted by
+    #its corpus frequency) and the chain continues from that word
+    def __init__(self, lexicon, lexicon_rate=0.02, random_state=0):
+        self.corpus = Corpus()
+        self.lexicon, self.lexicon_rate = lexicon, lexicon_rate
+        self.random_state = random_state
+
+    #reviews is an iterable of (text, label) pairs and is streamed, only the
+    #vocabulary, bigram counts and length histogram are kept. layout is the
+    #on-disk layout the reviews came from, Generate only writes that layout
+    #(None allows any)
+    def Fit(self, reviews, layout=None):
+        self.layout_ = layout
+        self.vocabulary, self.words = {}, []
+        unigrams, bigrams, lengths = {}, {}, {}
+        for text, label in reviews:
+            label = bool(label)
+            tokens = text.split()
+            ids = [self.vocabulary.setdefault(token, len(self.vocabulary))
+                   for token in tokens]
+            unigrams.setdefault(label, Counter()).update(ids)
+            bigrams.setdefault(label, Counter()).update(zip(ids, ids[1:]))
+            lengths.setdefault(label, Counter())[len(ids)] += 1
+        self.words = np.array(sorted(self.vocabulary,
+                                     key=self.vocabulary.get), dtype=object)
+        self.models = {}
+        for label in unigrams:
+            self.models[label] = self._Model(unigrams[label], bigrams[label],
+                                             lengths[label], label)
+        self.n_reviews_ = dict((label, sum(lengths[label].values()))
+                               for label in lengths)
+        return self
+
+    #Fit on the txt_sentoken pos/neg folders
+    def FitMovies(self, datapath):
+        def reviews():
+            for label in ['neg', 'pos']:
+                path = os.path.join(datapath, label)
+                for name in sorted(os.listdir(path)):
+                    with io.open(os.path.join(path, name), 'r',
+                                 encoding='cp1252') as fo:
+                        yield fo.read(), label == 'pos'
+        return self.Fit(reviews(), 'movies')
+
+    #Fit on the Edmunds corpus; see _FitGrouped for the labels
+    def FitEdmunds(self, datapath, threshold=None, shards=None):
+        return self._FitGrouped(self.corpus.IterEdmunds, datapath, threshold,
+                                shards, 'edmunds')
+
+    #Fit on the TripAdvisor corpus; see _FitGrouped for the labels
+    def FitTripAdvisor(self, datapath, threshold=None, shards=None):
+        return self._FitGrouped(self.corpus.IterTripAdvisor, datapath,
+                                threshold, shards, 'tripadvisor')
+
+    #Reviews carry no rating of their own, every review is labelled with
+    #its entity's overall_rating from the rating CSVs: positive when it is
+    #at least threshold (default the median over the rated entities).
+    #Reviews of unrated entities are left out
+    def _FitGrouped(self, reviews, datapath, threshold, shards, layout):
+        ratings = {}
+        for shard, row in self.corpus.IterRatings(datapath, shards):
+            entity = row.get('doc_id', row.get('docid'))
+            rating = float(row.get('overall_rating') or 'nan')
+            if rating > 0:
+                ratings.setdefault(entity, rating)
+        if threshold is None:
+            threshold = np.median(list(ratings.values()))
+
+        def labelled():
+            for shard, entity, review in reviews(datapath, shards):
+                if entity in ratings:
+                    yield (' '.join(TOKEN.findall(review.lower())),
+                           ratings[entity] >= threshold)
+        return self.Fit(labelled(), layout)
+
+    #Flatten the counts into arrays that can be sampled for many chains at
+    #once. Successors of token i live in keys[indptr[i]:indptr[i+1]] as
+    #i + cumulative probability, so one searchsorted of (i + u) over the
+    #whole array draws the next token of every chain
+    def _Model(self, unigrams, bigrams, lengths, label):
+        n = len(self.vocabulary)
+        pairs = sorted(bigrams.items())
+        prev = np.array([p for (p, q), c in pairs], dtype=np.int64)
+        succ = np.array([q for (p, q), c in pairs], dtype=np.int64)
+        count = np.array([c for pair, c in pairs], dtype=np.float64)
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(prev,
+                                                            minlength=n))])
+        totals = np.bincount(prev, weights=count, minlength=n)
+        cum = np.cumsum(count)
+        #restart the running sum at every row
+        cum -= np.repeat(np.concatenate([[0], cum])[indptr[:-1]],
+                         np.diff(indptr))
+        keys = prev + cum / np.maximum(totals[prev], 1)
+        unigram = np.bincount(list(unigrams.keys()), weights=list(
+            unigrams.values()), minlength=n)
+        #lexicon words for this label, weighted by frequency with add one
+        #smoothing so words absent from the corpus can still appear
+        polarity = 1 if label else -1
+        lexicon = [word for word in sorted(self.lexicon)
+                   if self.lexicon[word] == polarity]
+        lexicon_ids = np.array([self.vocabulary.get(word, -1)
+                                for word in lexicon])
+        lexicon_weights = np.where(lexicon_ids >= 0,
+                                   unigram[np.maximum(lexicon_ids, 0)], 0) + 1
+        length_values = np.array(sorted(lengths))
+        return {'keys': keys, 'succ': succ, 'indptr': indptr,
+                'unigram': np.cumsum(unigram) / unigram.sum(),
+                'lexicon': np.array(lexicon, dtype=object),
+                'lexicon_ids': lexicon_ids,
+                'lexicon_cum': np.cumsum(lexicon_weights) /
+                    lexicon_weights.sum(),
+                'lengths': length_values,
+                'length_cum': np.cumsum([lengths[v] for v in length_values])
+                    / float(sum(lengths.values()))}
+
+    #Sample n reviews of one label in lock step; returns lists of tokens
+    def Sample(self, n, label, rng):
+        if n == 0:
+            return []
+        model = self.models[bool(label)]
+        lengths = model['lengths'][np.searchsorted(model['length_cum'],
+                                                   rng.rand(n))]
+        tokens = np.empty((n, lengths.max()), dtype=object)
+        state = np.searchsorted(model['unigram'], rng.rand(n))
+        indptr, keys, succ = model['indptr'], model['keys'], model['succ']
+        for step in range(lengths.max()):
+            words = self.words[state]
+            #lexicon injection
+            inject = rng.rand(n) < self.lexicon_rate
+            if inject.any():
+                picks = np.searchsorted(model['lexicon_cum'],
+                                        rng.rand(inject.sum()))
+                words[inject] = model['lexicon'][picks]
+                ids = model['lexicon_ids'][picks]
+                #out of vocabulary lexicon words restart from the unigram
+                ids[ids < 0] = np.searchsorted(model['unigram'],
+                                               rng.rand((ids < 0).sum()))
+                state[inject] = ids
+            tokens[:, step] = words
+            #next token; tokens never seen with a successor restart from
+            #the unigram distribution
+            nxt = np.searchsorted(keys, state + rng.rand(n))
+            dead = indptr[state] == indptr[state + 1]
+            nxt = np.minimum(nxt, len(succ) - 1)
+            state = np.where(dead, np.searchsorted(model['unigram'],
+                                                   rng.rand(n)), succ[nxt])
+        return [list(row[:length]) for row, length in zip(tokens, lengths)]
+
+    #Yield (index, label, tokens) for n_reviews reviews, half per label,
+    #batch reviews at a time so memory doesn't grow with the output size
+    def IterReviews(self, n_reviews, batch=500):
+        rng = np.random.RandomState(self.random_state)
+        index = 0
+        while index < n_reviews:
+            size = min(batch, n_reviews - index)
+            labels = np.arange(index, index + size) % 2 == 1
+            for label in [False, True]:
+                for tokens in self.Sample(int((labels == label).sum()),
+                                          label, rng):
+                    yield index, label, tokens
+                    index += 1
+
+    #Write scale x the fitted corpus size in one of the on-disk layouts the
+    #loaders read: 'movies' (pos/neg folders of txt_sentoken files),
+    #'edmunds' (<year>/<year>_<vehicle> DOC files) or 'tripadvisor'
+    #(<city>/<hotel> TSV files). Edmunds/TripAdvisor labels go to labels.csv.
+    #layout defaults to the one fitted on; a model fitted on another corpus
+    #would fill the layout with the wrong vocabulary
+    def Generate(self, outpath, layout=None, scale=10,
+                 reviews_per_entity=100, shards=3):
+        if layout is None:
+            layout = self.layout_ or 'movies'
+        elif self.layout_ not in (None, layout):
+            raise ValueError("Fitted on the {} corpus, not {}".format(
+                self.layout_, layout))
+        n_reviews = scale * sum(self.n_reviews_.values())
+        writer = {'movies': self._WriteMovies, 'edmunds': self._WriteEdmunds,
+                  'tripadvisor': self._WriteTripAdvisor}[layout]
+        if not os.path.exists(outpath):
+            os.makedirs(outpath)
+        writer(outpath, self.IterReviews(n_reviews), reviews_per_entity,
+               shards)
+        return n_reviews
+
+    def _WriteMovies(self, outpath, reviews, reviews_per_entity, shards):
+        for label in ['neg', 'pos']:
+            if not os.path.exists(os.path.join(outpath, label)):
+                os.makedirs(os.path.join(outpath, label))
+        for index, label, tokens in reviews:
+            name = os.path.join(outpath, 'pos' if label else 'neg',
+                                'cv{:07d}_{}.txt'.format(index,
+                                                         self.random_state))
+            with io.open(name, 'w', encoding='cp1252',
+                         errors='replace') as fo:
+                #txt_sentoken has one sentence per line
+                fo.write(u' '.join(tokens).replace(u' . ', u' . \n') + u'\n')
+
+    #Reviews are grouped into entity files of reviews_per_entity reviews,
+    #entity files are spread round robin over the shard folders; only one
+    #entity file is ever open
+    def _WriteGrouped(self, outpath, reviews, reviews_per_entity, shards,
+                      shard_names, entity_name, header, write):
+        fo, labels = None, io.open(os.path.join(outpath, 'labels.csv'), 'w')
+        labels.write(u'doc_id,review,label\n')
+        try:
+            for index, label, tokens in reviews:
+                entity = index // reviews_per_entity
+                if index % reviews_per_entity == 0:
+                    if fo is not None:
+                        fo.close()
+                    shard = shard_names[entity % shards]
+                    doc_id = entity_name(shard, entity)
+                    if not os.path.exists(os.path.join(outpath, shard)):
+                        os.makedirs(os.path.join(outpath, shard))
+                    fo = io.open(os.path.join(outpath, shard, doc_id), 'w',
+                                 encoding='cp1252', errors='replace')
+                    fo.write(header(doc_id))
+                write(fo, index, u' '.join(tokens))
+                labels.write(u'{},{},{}\n'.format(
+                    doc_id, index % reviews_per_entity, int(label)))
+        finally:
+            if fo is not None:
+                fo.close()
+            labels.close()
+
+    def _WriteEdmunds(self, outpath, reviews, reviews_per_entity, shards):
+        def write(fo, index, text):
+            fo.write(u'<DOC>\n<DATE>01/01/2009</DATE>\n'
+                     u'<AUTHOR>synthetic{}</AUTHOR>\n<TEXT>{}</TEXT>\n'
+                     u'<FAVORITE></FAVORITE>\n</DOC>\n'.format(index, text))
+        self._WriteGrouped(
+            outpath, reviews, reviews_per_entity, shards,
+            [str(2007 + i) for i in range(shards)],
+            lambda shard, entity: u'{}_synthetic_{}'.format(shard, entity),
+            lambda doc_id: u'<DOCNO>{}</DOCNO>\n'.format(doc_id), write)
+
+    def _WriteTripAdvisor(self, outpath, reviews, reviews_per_entity, shards):
+        def write(fo, index, text):
+            #title is the first few words like the real dumps
+            fo.write(u'Jan 01 2009 \t{}\t{}\t\n'.format(
+                u' '.join(text.split()[:6]), text.replace(u'\t', u' ')))
+        self._WriteGrouped(
+            outpath, reviews, reviews_per_entity, shards,
+            ['city{}'.format(i) for i in range(shards)],
+            lambda shard, entity: u'synthetic_{}_hotel_{}'.format(shard,
+                                                                  entity),
+            lambda doc_id: u'', write)
+
+if __name__ == '__main__':
+    lexicon = Corpus().ReadBingLiu(r'data/sentiment')
+    generators = [
+        ('movies', SyntheticCorpus(lexicon).FitMovies(r'data/txt_sentoken')),
+        ('edmunds', SyntheticCorpus(lexicon).FitEdmunds(r'data/cars/data')),
+        ('tripadvisor', SyntheticCorpus(lexicon).FitTripAdvisor(
+            r'data/hotels/data'))]
+    for layout, generator in generators:
+        for scale in [10, 100, 1000]:
+            print('{} {} reviews written'.format(generator.Generate(
+                r'synthetic/{}_x{}'.format(layout, scale), layout, scale),
+                layout))
@@ -1,7 +1,11 @@
 import time
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.cross_validation import KFold, train_test_split,cross_val_score
+from sklearn.base import clone
+#cross_validation was replaced by model_selection in newer scikit-learn
+try:
+    from sklearn.model_selection import cross_val_score
+except ImportError:
+    from sklearn.cross_validation import cross_val_score
 
 class Util:
     def __init__(self):
@@ -10,6 +14,8 @@ class Util:
     #Helper method to automatically calculate accuracy given a classifier, nfolds, features and labels
     #TO BE DEPRECATED
     def CalculateAccuracy(self, clf, nfolds, train_features, train_labels, test_features, test_labels):
+        #old KFold(n, n_folds) API, only in sklearn.cross_validation
+        from sklearn.cross_validation import KFold
         #Kfold and accuracy initialization
         kf = KFold(train_features.shape[0], n_folds = nfolds)
         train_accuracy, test_accuracy = np.empty(nfolds), np.empty(nfolds)
@@ -36,4 +42,45 @@ class Util:
             time0 = time.time()
             scores.append(cross_val_score(clf, X, y,cv=k, scoring=score_str))
             times.append(time.time()-time0)
-        return times,np.mean(scores,axis=1)
\ No newline at end of file
+        return times,np.mean(scores,axis=1)
+    #Flip the TFIDF values of negative lexicon words in place on the CSR data
+    #array. vocabulary is the vectorizer's column order; no copy of the
+    #matrix is made and its dtype (float32 or float64) is kept
+    def SignFeatures(self, X, vocabulary, neg):
+        neg = set(neg)
+        signs = np.array([-1 if word in neg else 1 for word in vocabulary],
+                         dtype=X.dtype)
+        X.data *= signs[X.indices]
+        return X
+
+    #Signed TFIDF features of the reviews over the pos + neg lexicons in the
+    #given precision; float32 halves the memory of the matrix
+    def SignedFeatures(self, review_list, pos, neg, dtype=np.float32):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        pos_set = set(pos)
+        vocabulary = list(pos) + [word for word in neg if word not in pos_set]
+        vectorizer = TfidfVectorizer(decode_error='replace',
+                                     strip_accents='unicode',
+                                     vocabulary=vocabulary, lowercase=True,
+                                     dtype=dtype)
+        X = vectorizer.fit_transform(review_list).tocsr()
+        return self.SignFeatures(X, vocabulary, neg), vectorizer
+
+    #Cross validated score, fit time and feature matrix size of clf for each
+    #precision, to check float32 against float64 on a given feature set.
+    #A clf with a dtype parameter is set to the same precision
+    def PrecisionComparison(self, clf, review_list, y, pos, neg, k=5,
+                            score_str='accuracy',
+                            dtypes=(np.float64, np.float32)):
+        results = {}
+        for dtype in dtypes:
+            X, vectorizer = self.SignedFeatures(review_list, pos, neg, dtype)
+            if 'dtype' in clf.get_params():
+                clf = clone(clf).set_params(dtype=dtype)
+            time0 = time.time()
+            scores = cross_val_score(clf, X, y, cv=k, scoring=score_str)
+            results[np.dtype(dtype).name] = {
+                'score': np.mean(scores), 'std': np.std(scores),
+                'time': time.time()-time0,
+                'nbytes': X.data.nbytes + X.indices.nbytes + X.indptr.nbytes}
+        return results
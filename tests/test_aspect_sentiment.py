@@ -0,0 +1,70 @@
+import io
+import os
+
+import numpy as np
+import pytest
+
+from code.aspect_sentiment import AspectSentiment
+
+LEXICON = {'clean': 1, 'dirty': -1, 'great': 1, 'noisy': -1, 'big': 1}
+
+@pytest.fixture
+def hotels(tmp_path):
+    #TripAdvisor layout: <city>/<hotel> review files next to <city>.csv
+    seedpath = str(tmp_path / 'hotels.seed')
+    with io.open(seedpath, 'w', encoding='cp1252') as fo:
+        fo.write(u'#aspect=2\nroom\tbig room, room\n'
+                 u'cleanliness\tclean, very clean\n')
+    datapath = tmp_path / 'data'
+    (datapath / 'paris').mkdir(parents=True)
+    reviews = {'hotel_a': [u'Great room. Very clean but noisy.',
+                           u'Dirty room!'],
+               'hotel_b': [u'Nothing to report', u'clean room, dirty bath']}
+    for hotel, texts in reviews.items():
+        with io.open(str(datapath / 'paris' / hotel), 'w',
+                     encoding='cp1252') as fo:
+            for text in texts:
+                fo.write(u'Jan 01 2009 \ttitle\t{}\t\n'.format(text))
+    with io.open(str(datapath / 'paris.csv'), 'w', encoding='cp1252') as fo:
+        fo.write(u'doc_id,street,ROOM,CLEANLINESS\n'
+                 u'hotel_a,1 main street,4.5,3.0\n'
+                 #unquoted comma in the street shifts the ratings right
+                 u'hotel_b,2 side street, paris,-1,5.0\n')
+    return AspectSentiment(seedpath, LEXICON), str(datapath)
+
+def test_score_sentences(hotels):
+    model, datapath = hotels
+    assigned, score = model.ScoreSentences(
+        ['The room was great', 'Very clean but noisy', 'nothing here',
+         'clean room, dirty bathroom', 'big room'])
+    room, cleanliness = model.aspect_index['room'], \
+        model.aspect_index['cleanliness']
+    expected = np.zeros((5, 2))
+    expected[[0, 3, 4], room] = 1
+    expected[[1, 3], cleanliness] = 1
+    np.testing.assert_array_equal(assigned.toarray(), expected)
+    #seed words ("clean", "big" in "big room") are not scored again
+    np.testing.assert_array_equal(score, [1, -1, 0, -1, 0])
+
+def test_aggregate(hotels):
+    model, datapath = hotels
+    df = model.Aggregate(datapath, 'hotels', chunksize=2)
+    df = df.set_index('doc_id')
+    assert list(df['num_reviews']) == [2, 2]
+    assert list(df['shard']) == ['paris', 'paris']
+    #hotel_a: room sentences score 1 (great) and -1 (dirty)
+    assert df.loc['hotel_a', 'room'] == 0
+    assert df.loc['hotel_a', 'n_room'] == 2
+    assert df.loc['hotel_a', 'cleanliness'] == -1
+    assert df.loc['hotel_b', 'room'] == -1
+    assert df.loc['hotel_b', 'n_cleanliness'] == 1
+
+def test_ratings_shifted_rows(hotels):
+    model, datapath = hotels
+    ratings = model.Ratings(datapath)
+    assert list(ratings.columns) == ['cleanliness', 'room']
+    assert ratings.loc['hotel_a', 'room'] == 4.5
+    assert ratings.loc['hotel_a', 'cleanliness'] == 3.0
+    #-1 means not rated
+    assert np.isnan(ratings.loc['hotel_b', 'room'])
+    assert ratings.loc['hotel_b', 'cleanliness'] == 5.0
@@ -0,0 +1,49 @@
+import numpy as np
+
+from code.dedup import MinHashDedup
+
+BASE = ('the hotel room was clean and quiet with a great view of the river '
+        'and the staff at the front desk were friendly and helpful')
+OTHER = ('terrible gas mileage and the seats get uncomfortable after an hour '
+         'on the highway but the stereo is excellent')
+
+def test_signatures_persist(tmp_path):
+    #np.savez adds .npz, a path without it must still be reloaded
+    sigpath = str(tmp_path / 'signatures')
+    texts = [BASE, OTHER, BASE + ' really']
+    first = MinHashDedup(sigpath=sigpath)
+    first.Duplicates(texts)
+    assert first.hashed_ == 3
+    second = MinHashDedup(sigpath=sigpath)
+    duplicate_of = second.Duplicates(texts + ['a new review'])
+    assert second.hashed_ == 1
+    np.testing.assert_array_equal(duplicate_of[:3],
+                                  first.Duplicates(texts))
+    #signatures from other hash functions are not reused
+    other = MinHashDedup(sigpath=sigpath, random_state=1)
+    other.Duplicates(texts)
+    assert other.hashed_ == 3
+
+def test_threshold():
+    texts = [BASE, OTHER, BASE.replace('great', 'nice'), BASE]
+    loose = MinHashDedup(threshold=0.5)
+    np.testing.assert_array_equal(loose.Duplicates(texts), [-1, -1, 0, 0])
+    #only the exact repost is similar enough
+    strict = MinHashDedup(threshold=0.99)
+    np.testing.assert_array_equal(strict.Duplicates(texts), [-1, -1, -1, 0])
+
+def test_chance_collision_at_bucket_head():
+    #documents 1 and 2 are duplicates but only share their first band with
+    #document 0, which is not similar to either
+    dedup = MinHashDedup(threshold=0.8, num_perm=8, bands=2)
+    signatures = np.array([[1, 1, 1, 1, 9, 9, 9, 9],
+                           [1, 1, 1, 1, 2, 2, 2, 2],
+                           [1, 1, 1, 1, 2, 2, 2, 3]], dtype=np.uint64)
+    assert dedup.DuplicatePairs(signatures) == set([(1, 2)])
+
+def test_report_per_source():
+    texts = [BASE, OTHER, BASE, OTHER, BASE, 'something else entirely']
+    sources = ['2007', '2007', '2008', '2008', '2009', '2009']
+    duplicate_of, report = MinHashDedup().Dedup(texts, sources)
+    np.testing.assert_array_equal(duplicate_of, [-1, -1, 0, 1, 0, -1])
+    assert report == {'2007': 0, '2008': 2, '2009': 1}
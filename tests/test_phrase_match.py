@@ -0,0 +1,50 @@
+import random
+
+import numpy as np
+
+from code.phrase_match import PhraseMatcher
+
+WORDS = ['very', 'comfortable', 'seat', 'seats', 'not', 'good', 'gas',
+         'mileage', 'great']
+PHRASES = [('comfortable', 'comfort'), ('very comfortable', 'comfort'),
+           ('comfortable seat', 'comfort'), ('seat', 'interior'),
+           ('gas mileage', 'fuel'), ('mileage', 'fuel'),
+           ('not good', 'negative'), ('good gas mileage', 'fuel'),
+           ('good', 'positive'), ('very very', 'intensifier')]
+
+def _naive(matcher, tokens):
+    phrases = [tuple(phrase.split()) for phrase in matcher.phrases]
+    return sorted((end, phrase_id) for phrase_id, phrase in enumerate(phrases)
+                  for end in range(len(phrase) - 1, len(tokens))
+                  if tuple(tokens[end - len(phrase) + 1:end + 1]) == phrase)
+
+def test_matches_naive_search():
+    matcher = PhraseMatcher(PHRASES)
+    rng = random.Random(0)
+    for i in range(2000):
+        tokens = [rng.choice(WORDS + [None, 'other'])
+                  for j in range(rng.randint(0, 12))]
+        assert sorted(matcher.MatchTokens(tokens)) == _naive(matcher, tokens)
+
+def test_phrases_tokenized_like_documents():
+    matcher = PhraseMatcher([("Well-Made", 1), ("well made", 1),
+                             ("2-faced", -1)])
+    #duplicates after tokenization are dropped
+    assert matcher.phrases == ['well made', '2 faced']
+    assert matcher.Match("A well-made, 2-faced car") == [0, 1]
+
+def test_transform_groups():
+    matcher = PhraseMatcher(PHRASES)
+    docs = ['Very comfortable seats', 'not good gas mileage', '', 'seat']
+    counts = matcher.TransformGroups(docs, chunksize=3)
+    names = matcher.group_names
+    expected = np.zeros((len(docs), len(names)), dtype=np.int32)
+    for i, phrases in enumerate([['very comfortable', 'comfortable'],
+                                 ['not good', 'good', 'good gas mileage',
+                                  'gas mileage', 'mileage'], [], ['seat']]):
+        for phrase in phrases:
+            expected[i, matcher.groups[matcher.phrases.index(phrase)]] += 1
+    np.testing.assert_array_equal(counts.toarray(), expected)
+    np.testing.assert_array_equal(
+        matcher.TransformGroups(docs, n_jobs=2, chunksize=1).toarray(),
+        expected)
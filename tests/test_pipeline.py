@@ -0,0 +1,35 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from code.pipeline import InMemoryCollection, PipelinedVectorizer
+
+TEXTS = ['a good film with a good plot', 'a bad film', 'the the the',
+         'good acting and a bad ending', '', 'plot plot plot twist',
+         'the and a', 'great film great acting', 'bad bad film', 'a plot']
+
+def _collection(texts):
+    return InMemoryCollection([{'Review': text, 'Opinion': i % 2 == 1}
+                               for i, text in enumerate(texts)])
+
+def _compare(texts, **params):
+    expected = TfidfVectorizer(**params)
+    X_expected = expected.fit_transform(texts)
+    vectorizer = PipelinedVectorizer(batch_size=3, n_jobs=2, **params)
+    X, y = vectorizer.FitTransform(_collection(texts))
+    assert vectorizer.vocabulary_ == expected.vocabulary_
+    np.testing.assert_allclose(X.toarray(), X_expected.toarray())
+    np.testing.assert_array_equal(y, np.arange(len(texts)) % 2 == 1)
+
+def test_matches_tfidf_vectorizer():
+    _compare(TEXTS)
+
+def test_document_frequency_limits_use_the_whole_collection():
+    #limits applied per batch of 3 would drop terms spread across batches
+    _compare(TEXTS, min_df=2)
+    _compare(TEXTS, min_df=0.2, max_df=0.5)
+    _compare(TEXTS, max_features=4)
+
+def test_batch_of_only_stop_words():
+    #the second batch has no terms left after stop word removal
+    _compare(TEXTS[:3] + ['', 'the and', 'a'] + TEXTS[3:],
+             stop_words='english')
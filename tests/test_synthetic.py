@@ -0,0 +1,48 @@
+import io
+
+import numpy as np
+import pytest
+
+from code.synthetic import SyntheticCorpus
+
+LEXICON = {'clean': 1, 'great': 1, 'dirty': -1, 'rude': -1}
+
+@pytest.fixture
+def hotels(tmp_path):
+    #TripAdvisor layout with the glued overall_ratingsource header
+    datapath = tmp_path / 'data'
+    (datapath / 'paris').mkdir(parents=True)
+    reviews = {'good_hotel': u'Great room, very clean!\tThe staff were great.',
+               'bad_hotel': u'Dirty room.\tRude staff, dirty bathroom.',
+               'unrated_hotel': u'Nothing\tto say.'}
+    for hotel, review in reviews.items():
+        with io.open(str(datapath / 'paris' / hotel), 'w',
+                     encoding='cp1252') as fo:
+            fo.write(u'Jan 01 2009 \t{}\t\n'.format(review))
+    with io.open(str(datapath / 'paris.csv'), 'w', encoding='cp1252') as fo:
+        fo.write(u'doc_id,street,CLEANLINESS,overall_ratingsource\n'
+                 u'good_hotel,1 main street,5.0,4.5,,\n'
+                 u'bad_hotel,2 side street,1.0,2.0,,\n'
+                 u'unrated_hotel,3 back street,0.0,-1,,\n')
+    return str(datapath)
+
+def test_fit_tripadvisor_labels_from_overall_rating(hotels):
+    generator = SyntheticCorpus(LEXICON).FitTripAdvisor(hotels)
+    assert generator.n_reviews_ == {True: 1, False: 1}
+    #punctuation is kept as tokens so sentences survive generation
+    assert '.' in generator.vocabulary and 'great' in generator.vocabulary
+    assert 'nothing' not in generator.vocabulary
+
+def test_generate_checks_layout(hotels, tmp_path):
+    generator = SyntheticCorpus(LEXICON).FitTripAdvisor(hotels)
+    with pytest.raises(ValueError):
+        generator.Generate(str(tmp_path / 'out'), 'movies')
+    assert generator.Generate(str(tmp_path / 'out'), scale=3,
+                              reviews_per_entity=2, shards=2) == 6
+    assert (tmp_path / 'out' / 'city0').exists()
+
+def test_iter_reviews_odd_count(hotels):
+    generator = SyntheticCorpus(LEXICON).FitTripAdvisor(hotels)
+    assert generator.Sample(0, True, np.random.RandomState(0)) == []
+    reviews = list(generator.IterReviews(3, batch=1))
+    assert [index for index, label, tokens in reviews] == [0, 1, 2]